@@ -1,7 +1,6 @@
 import streamlit as st
 import sys
 import os
-import numpy as np
 from datetime import datetime
 import io
 import json
@@ -10,17 +9,11 @@ import json
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.pdf_parser import extract_text_from_pdf, chunk_by_topic
-from core.embeddings import get_embeddings
-from core.retrieval import (
-    create_faiss_index,
-    retrieve_top_k,
-    save_faiss_index,
-    load_faiss_index,
-    save_chunks,
-    load_chunks
-)
+from core.knowledge_base import KnowledgeBaseError, ingest_pdf, index_uploaded_chunks
+from core.retrieval import retrieve_top_k
+from core.snapshots import load_snapshot, adopt_legacy_files
 from core.llm_integration import generate_answer
+from config.runtime import load_runtime_settings
 from config.settings import TOP_K, UPLOADS_DIR
 
 st.set_page_config(page_title="📚 StudyMate - AI PDF Q&A", layout="wide")
@@ -35,40 +28,45 @@ if "history" not in st.session_state:
 # Try loading saved chunks and index
 all_chunks = []
 index = None
-saved_chunks = load_chunks("study_chunks.json")
-saved_index = load_faiss_index("study_index.index")
+adopt_legacy_files()
+snapshot = load_snapshot()
 
-if saved_chunks and saved_index:
-    all_chunks = saved_chunks
-    index = saved_index
+if snapshot:
+    all_chunks = snapshot.chunks
+    index = snapshot.index
     st.success(f"✅ Loaded {len(all_chunks)} chunks from saved data.")
 
 # Upload PDF files
 uploaded_files = st.file_uploader("Upload your PDF(s)", type=["pdf"], accept_multiple_files=True)
 
-if uploaded_files:
-    all_chunks = []
-    for file in uploaded_files:
-        # Save PDF to uploads folder
-        pdf_path = os.path.join(UPLOADS_DIR, file.name)
-        with open(pdf_path, "wb") as f:
-            f.write(file.getbuffer())
-
-        # Extract and chunk
-        text = extract_text_from_pdf(pdf_path)
-        chunks = chunk_by_topic(text)
-        all_chunks.extend(chunks)
-
-    st.success(f"✅ Processed {len(all_chunks)} topic-based chunks from {len(uploaded_files)} file(s).")
-
-    # Save chunks to disk
-    save_chunks(all_chunks, "study_chunks.json")
-
-    # Create and save FAISS index
-    embeddings = get_embeddings(all_chunks)
-    embeddings_array = np.array(embeddings)
-    index = create_faiss_index(embeddings_array)
-    save_faiss_index(index, "study_index.index")
+# Streamlit reruns this script on every interaction; only ingest and publish
+# a new snapshot when the set of uploaded files actually changes
+upload_key = sorted((file.name, file.size) for file in uploaded_files or [])
+if uploaded_files and st.session_state.get("published_upload") != upload_key:
+    settings = load_runtime_settings()
+    new_chunks = []
+    documents = []
+    try:
+        for file in uploaded_files:
+            # Save PDF to uploads folder
+            pdf_path = os.path.join(UPLOADS_DIR, file.name)
+            with open(pdf_path, "wb") as f:
+                f.write(file.getbuffer())
+
+            # Extract (and store page text for /reindex) and chunk
+            chunks, document = ingest_pdf(pdf_path, file.name, settings)
+            new_chunks.extend(chunks)
+            documents.append(document)
+
+        # Build the FAISS index and publish it with the chunks as one snapshot
+        index_uploaded_chunks(new_chunks, documents)
+        st.session_state.published_upload = upload_key
+        snapshot = load_snapshot()
+        all_chunks = snapshot.chunks if snapshot else []
+        index = snapshot.index if snapshot else None
+        st.success(f"✅ Processed {len(new_chunks)} chunks from {len(uploaded_files)} file(s).")
+    except KnowledgeBaseError as e:
+        st.error(e.message)
 
 # Question input
 question = st.text_input("Ask a question about your PDFs:")
@@ -0,0 +1,280 @@
+"""
+Asyncio-native version of app.py with the same endpoints and JSON contract.
+
+LLM calls are awaited, CPU-bound work (PDF parsing, chunking, embeddings,
+FAISS) runs on a thread pool, so one process can hold thousands of in-flight
+questions without one OS thread each.
+
+Run from the Backend directory:
+    uvicorn async_app:app --host 127.0.0.1 --port 8000
+"""
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+
+# upload / reindex / reset pipeline shared with app.py
+from core.knowledge_base import (
+    KnowledgeBaseError,
+    ingest_pdf,
+    index_uploaded_chunks,
+    upload_result,
+    reindex_knowledge_base,
+    reset_knowledge_base,
+    rollback_knowledge_base,
+    chunks_info,
+    auto_summary_from_chunks_async,
+)
+# micro-batched query embedding + search for concurrent /ask requests
+from core.batching import query_batcher
+# versioned chunks/index snapshots (atomic publish, lock-free readers)
+from core.snapshots import cached_snapshot, load_snapshot, adopt_legacy_files
+# LLM (Hugging Face Hub chat, async client)
+from core.llm_integration import generate_answer_async
+
+# user-editable runtime settings (persisted in data/settings.json)
+from config.runtime import (
+    load_runtime_settings,
+    save_runtime_settings,
+    parse_settings_update,
+)
+# base config (directories + defaults)
+from config.settings import (
+    BASE_DATA_DIR,
+    UPLOADS_DIR,
+    CHUNKS_DIR,
+    INDEX_DIR,
+    TEXT_DIR,
+    SNAPSHOTS_DIR,
+    TOP_K as DEFAULT_TOP_K,
+)
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------
+
+app = FastAPI(title="StudyMate API")
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# CPU-bound work (embeddings, FAISS, PDF parsing, file I/O) runs here so the
+# event loop stays free for I/O
+cpu_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="studymate-cpu")
+# Loading a newly published snapshot gets its own small pool, so /ask never
+# queues behind uploads or reindexes busy on cpu_executor
+snapshot_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="studymate-snapshot")
+
+RUNTIME = load_runtime_settings()
+
+# ------------- helpers -------------
+
+def error(message, status_code):
+    return JSONResponse({"ok": False, "error": message}, status_code=status_code)
+
+def kb_error(e: KnowledgeBaseError):
+    return error(e.message, e.status_code)
+
+async def run_cpu(fn, *args):
+    """Run a blocking function on the CPU executor and await its result."""
+    return await asyncio.get_running_loop().run_in_executor(cpu_executor, fn, *args)
+
+async def current_snapshot():
+    """Current snapshot: the cached one inline, loading it only after a swap."""
+    snapshot = cached_snapshot()
+    if snapshot is None:
+        snapshot = await asyncio.get_running_loop().run_in_executor(snapshot_executor, load_snapshot)
+    return snapshot
+
+async def json_body(request: Request):
+    """Parse the JSON body like Flask's get_json(force=True, silent=True)."""
+    try:
+        data = json.loads(await request.body() or b"{}")
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def write_file(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+def touch_dirs():
+    for d in (BASE_DATA_DIR, UPLOADS_DIR, CHUNKS_DIR, INDEX_DIR, TEXT_DIR, SNAPSHOTS_DIR):
+        os.makedirs(d, exist_ok=True)
+
+touch_dirs()
+adopt_legacy_files()
+
+# ------------- endpoints -------------
+
+@app.get("/health")
+async def health():
+    # Same response as app.py's /health
+    current_time = datetime(2025, 8, 14, 11, 34, tzinfo=datetime.now().astimezone().tzinfo)
+    return {"status": "ok", "time": current_time.isoformat()}
+
+@app.get("/settings")
+async def get_settings():
+    return RUNTIME
+
+@app.post("/settings")
+async def update_settings(request: Request):
+    """
+    Body (any subset is fine), same as app.py:
+    { "mode": "topic"|"fixed", "similarity_threshold": 0.75, "chunk_size": 254,
+      "chunk_overlap": 32, "top_k": 3, "model_id": "..." }
+    """
+    global RUNTIME
+    data = await json_body(request)
+
+    # Validate and merge settings
+    try:
+        updated_settings = parse_settings_update(data)
+    except ValueError as e:
+        return error(str(e), 400)
+
+    RUNTIME = {**RUNTIME, **updated_settings}
+    await run_cpu(save_runtime_settings, RUNTIME)
+    return {"ok": True, "settings": RUNTIME}
+
+@app.post("/upload")
+async def upload_pdfs(files: List[UploadFile] = File(default=[])):
+    """
+    Accepts multiple PDFs under form field name 'files'.
+    Saves PDFs, extracts and persists per-page text, chunks (topic OR fixed),
+    builds FAISS index, publishes chunks/index as a new snapshot, and returns
+    an auto summary.
+    """
+    if not files:
+        return error("No files uploaded (use field 'files').", 400)
+
+    settings = RUNTIME
+    all_chunks = []
+    documents = []
+
+    for f in files:
+        # Save upload
+        save_path = os.path.join(UPLOADS_DIR, f.filename)
+        try:
+            await run_cpu(write_file, save_path, await f.read())
+            logger.debug(f"Saved file: {f.filename}")
+        except Exception as e:
+            logger.error(f"Failed to save {f.filename}: {e}")
+            return error(f"Failed to save {f.filename}: {str(e)}", 500)
+
+        try:
+            chunks, document = await run_cpu(ingest_pdf, save_path, f.filename, settings)
+        except KnowledgeBaseError as e:
+            return kb_error(e)
+        all_chunks.extend(chunks)
+        documents.append(document)
+
+    # Build index & publish chunks + index together as one snapshot
+    try:
+        await run_cpu(index_uploaded_chunks, all_chunks, documents)
+    except KnowledgeBaseError as e:
+        return kb_error(e)
+
+    # Auto summary
+    try:
+        summary = await auto_summary_from_chunks_async(all_chunks)
+        logger.debug("Generated summary")
+    except Exception as e:
+        logger.error(f"Failed to generate summary: {e}")
+        return error("Failed to generate summary", 500)
+
+    return upload_result([f.filename for f in files], all_chunks, summary, settings)
+
+@app.post("/ask")
+async def ask(request: Request):
+    """
+    Body:
+    { "question": "Your question here" }
+
+    Uses the current snapshot's chunks + FAISS index + current top_k to answer.
+    """
+    payload = await json_body(request)
+    question = str(payload.get("question", "")).strip()
+
+    if not question:
+        return error("Missing 'question'", 400)
+
+    # Pin one generation so chunks and index always match
+    snapshot = await current_snapshot()
+    if snapshot is None:
+        return error("No knowledge base loaded. Upload PDFs first.", 400)
+
+    top_k = int(RUNTIME.get("top_k", DEFAULT_TOP_K)) or DEFAULT_TOP_K
+    # The batcher's worker thread does the encode + search; awaiting its future
+    # holds no thread while the query waits for its batch
+    top_chunks = await asyncio.wrap_future(
+        query_batcher.submit(question, snapshot.index, snapshot.chunks, top_k=top_k)
+    )
+    answer = await generate_answer_async(top_chunks, question)
+
+    return {
+        "ok": True,
+        "answer": answer,
+        "context_count": len(top_chunks),
+        "used_top_k": top_k
+    }
+
+@app.post("/reindex")
+async def reindex():
+    """
+    Re-chunk and re-embed the current documents under the current settings,
+    from their stored page text (no PDF parsing). Queries keep being answered
+    from the old snapshot until the new one is published.
+    """
+    try:
+        return await run_cpu(reindex_knowledge_base, RUNTIME)
+    except KnowledgeBaseError as e:
+        return kb_error(e)
+
+@app.post("/rollback")
+async def rollback(request: Request):
+    """
+    Body (optional):
+    { "generation": 3 }
+
+    Make an earlier snapshot current again (the previous one by default).
+    """
+    payload = await json_body(request)
+    try:
+        return await run_cpu(rollback_knowledge_base, payload.get("generation"))
+    except KnowledgeBaseError as e:
+        return kb_error(e)
+
+@app.get("/chunks")
+async def get_chunks_info():
+    """
+    Inspect current chunk store.
+    """
+    return chunks_info(await current_snapshot())
+
+@app.post("/reset")
+async def reset_all():
+    """
+    Delete all snapshots (chunks, index, stored text) and (optionally) uploads.
+    """
+    return await run_cpu(reset_knowledge_base)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # Run on 127.0.0.1:8000 for local development (same port as app.py)
+    uvicorn.run(app, host="127.0.0.1", port=8000)
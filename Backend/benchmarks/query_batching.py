@@ -0,0 +1,74 @@
+"""
+Throughput of concurrent retrieval: one encode + search per query versus the
+micro-batching QueryBatcher.
+
+Run from the Backend directory:
+    python -m benchmarks.query_batching --threads 32 --queries 2000
+"""
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from core.embeddings import get_embeddings
+from core.retrieval import create_faiss_index, retrieve_top_k
+from core.batching import QueryBatcher
+
+TOPICS = [
+    "photosynthesis", "binary search trees", "the French revolution", "Newton's laws",
+    "supply and demand", "cell division", "TCP congestion control", "linear regression",
+    "the water cycle", "publish-subscribe messaging", "matrix multiplication", "plate tectonics",
+]
+
+def make_corpus(n_chunks):
+    return [
+        f"Section {i}: an explanation of {TOPICS[i % len(TOPICS)]} with examples and key definitions."
+        for i in range(n_chunks)
+    ]
+
+def make_queries(n_queries):
+    return [f"What is the main idea of {TOPICS[i % len(TOPICS)]}? ({i})" for i in range(n_queries)]
+
+def run(label, retrieve, queries, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(retrieve, queries))
+    elapsed = time.perf_counter() - start
+    qps = len(queries) / elapsed
+    print(f"{label:<28} {elapsed:8.2f} s  {qps:9.1f} queries/s")
+    return qps, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--wait-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    chunks = make_corpus(args.chunks)
+    index = create_faiss_index(np.array(get_embeddings(chunks)))
+    queries = make_queries(args.queries)
+    batcher = QueryBatcher(max_batch_size=args.batch_size, max_wait_ms=args.wait_ms)
+
+    # Warm up both paths (model weights, thread pools)
+    retrieve_top_k(queries[0], index, chunks, top_k=args.top_k)
+    batcher.retrieve_top_k(queries[0], index, chunks, top_k=args.top_k)
+
+    print(f"{args.queries} queries, {args.threads} threads, {args.chunks} chunks, top_k={args.top_k}")
+    single_qps, single = run(
+        "one query per call", lambda q: retrieve_top_k(q, index, chunks, top_k=args.top_k), queries, args.threads
+    )
+    batched_qps, batched = run(
+        f"batched (<= {args.batch_size}, {args.wait_ms:g} ms)",
+        lambda q: batcher.retrieve_top_k(q, index, chunks, top_k=args.top_k), queries, args.threads
+    )
+
+    mismatches = sum(a != b for a, b in zip(single, batched))
+    print(f"speedup: {batched_qps / single_qps:.2f}x  (result mismatches: {mismatches})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import os
+import json
+import logging
+
+from config.settings import BASE_DATA_DIR, TOP_K, MODEL_ID
+
+logger = logging.getLogger(__name__)
+
+# Where we persist app-level settings that the user can change live
+SETTINGS_PATH = os.path.join(BASE_DATA_DIR, "settings.json")
+os.makedirs(BASE_DATA_DIR, exist_ok=True)
+
+# Default runtime settings (user can override via /settings)
+DEFAULT_SETTINGS = {
+    "mode": "topic",                  # "topic" | "fixed"
+    "similarity_threshold": 0.80,     # used only for topic mode
+    "chunk_size": 254,                # model tokens, fixed mode only (window 256 minus [CLS]/[SEP])
+    "chunk_overlap": 32,              # model tokens, fixed mode only
+    "top_k": TOP_K,                   # retrieval
+    "model_id": MODEL_ID              # HF model id
+}
+
+def load_runtime_settings():
+    if os.path.exists(SETTINGS_PATH):
+        with open(SETTINGS_PATH, "r", encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+                return {**DEFAULT_SETTINGS, **data}
+            except Exception as e:
+                logger.error(f"Failed to load settings: {e}")
+                return DEFAULT_SETTINGS.copy()
+    return DEFAULT_SETTINGS.copy()
+
+def save_runtime_settings(settings: dict):
+    with open(SETTINGS_PATH, "w", encoding="utf-8") as f:
+        json.dump(settings, f, ensure_ascii=False, indent=2)
+
+def parse_settings_update(data: dict):
+    """
+    Validate a /settings body and return the accepted subset.
+    Unknown keys and unsupported values are ignored.
+
+    Raises:
+        ValueError: If a numeric setting cannot be converted.
+    """
+    updated_settings = {}
+    for key, value in data.items():
+        if key in DEFAULT_SETTINGS:
+            if key in ["similarity_threshold", "chunk_size", "chunk_overlap", "top_k"]:
+                try:
+                    updated_settings[key] = float(value) if key == "similarity_threshold" else int(value)
+                except (ValueError, TypeError):
+                    raise ValueError(f"Invalid value for {key}")
+            elif key == "mode" and value in ["topic", "fixed"]:
+                updated_settings[key] = value
+            elif key == "model_id" and isinstance(value, str):
+                updated_settings[key] = value
+    return updated_settings
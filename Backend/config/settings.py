@@ -11,12 +11,24 @@ CHUNK_SIZE = 500
 CHUNK_OVERLAP = 200
 TOP_K = 10
 
+# Query micro-batching: concurrent /ask queries are collected for up to
+# QUERY_BATCH_WAIT_MS (or QUERY_BATCH_MAX_SIZE queries) and embedded/searched together
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
+QUERY_BATCH_WAIT_MS = float(os.getenv("QUERY_BATCH_WAIT_MS", "5"))
+
 # Data storage paths
 BASE_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
 UPLOADS_DIR = os.path.join(BASE_DATA_DIR, "uploads")
 CHUNKS_DIR = os.path.join(BASE_DATA_DIR, "chunks")
 INDEX_DIR = os.path.join(BASE_DATA_DIR, "index")
+TEXT_DIR = os.path.join(BASE_DATA_DIR, "text")
+SNAPSHOTS_DIR = os.path.join(BASE_DATA_DIR, "snapshots")
+
+# Knowledge-base snapshots: retired generations are deleted after the grace
+# period, except the newest few which are kept for rollback
+SNAPSHOT_GRACE_SECONDS = 60
+SNAPSHOT_KEEP = 3
 
 # Ensure folders exist
-for path in [UPLOADS_DIR, CHUNKS_DIR, INDEX_DIR]:
+for path in [UPLOADS_DIR, CHUNKS_DIR, INDEX_DIR, TEXT_DIR, SNAPSHOTS_DIR]:
     os.makedirs(path, exist_ok=True)
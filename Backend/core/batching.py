@@ -0,0 +1,100 @@
+import time
+import queue
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import Future
+
+from config.settings import QUERY_BATCH_MAX_SIZE, QUERY_BATCH_WAIT_MS
+from core.retrieval import retrieve_top_k_batch
+
+logger = logging.getLogger(__name__)
+
+_Request = namedtuple("_Request", ["query", "index", "chunks", "top_k", "future"])
+
+class QueryBatcher:
+    """
+    Collects concurrent retrieval requests for a short window and serves them
+    with one embedding call plus one multi-query FAISS search per index.
+
+    Requests for different indexes (e.g. two snapshot generations during a
+    swap) are batched separately, so every request is answered from the index
+    it was submitted with.
+    """
+
+    def __init__(self, max_batch_size=QUERY_BATCH_MAX_SIZE, max_wait_ms=QUERY_BATCH_WAIT_MS):
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+    def retrieve_top_k(self, query, index, chunks, top_k=3):
+        """Blocking drop-in for retrieval.retrieve_top_k that goes through the batcher."""
+        return self.submit(query, index, chunks, top_k).result()
+
+    def submit(self, query, index, chunks, top_k=3):
+        """Queue a query and return a Future resolving to its top-k chunks."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put(_Request(query, index, chunks, top_k, future))
+        return future
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                worker = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+                worker.start()
+                self._worker = worker
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                deadline = time.monotonic() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        if remaining > 0:
+                            batch.append(self._queue.get(timeout=remaining))
+                        else:
+                            # Window is over; still take whatever is already queued
+                            batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                self._process(batch)
+            except Exception as e:
+                # Never let the worker die: fail whatever is still unresolved
+                logger.exception("Query batch failed")
+                for request in batch:
+                    if not request.future.done():
+                        try:
+                            request.future.set_exception(e)
+                        except Exception:
+                            pass
+
+    def _process(self, batch):
+        # Drop requests whose caller already gave up; the rest can no longer
+        # be cancelled, so resolving them below is safe
+        batch = [r for r in batch if r.future.set_running_or_notify_cancel()]
+
+        groups = {}
+        for request in batch:
+            groups.setdefault(id(request.index), []).append(request)
+
+        for requests in groups.values():
+            index, chunks = requests[0].index, requests[0].chunks
+            top_k = max(r.top_k for r in requests)
+            try:
+                results = retrieve_top_k_batch([r.query for r in requests], index, chunks, top_k=top_k)
+            except Exception as e:
+                for r in requests:
+                    r.future.set_exception(e)
+                continue
+            for r, result in zip(requests, results):
+                r.future.set_result(result[:r.top_k])
+
+# Shared per-process batcher used by the API
+query_batcher = QueryBatcher()
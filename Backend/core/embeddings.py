@@ -1,8 +1,126 @@
+import copy
+import math
+import hashlib
+import threading
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
 # Reuse the same embedding model as pdf_parser.py for consistency
 embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
 
+# Private copy of the model's fast (Rust-backed) word-piece tokenizer for
+# chunking. encode() reconfigures truncation/padding on its own instance, so
+# sharing one across threads can fail with "Already borrowed".
+tokenizer = copy.deepcopy(embedding_model.tokenizer)
+# Chunking measures whole documents; don't warn that they exceed the model window
+tokenizer.model_max_length = int(1e30)
+_tokenizer_lock = threading.Lock()
+
 def get_embeddings(chunks):
     """Generate embeddings for a list of text chunks."""
     return embedding_model.encode(chunks)
+
+def max_chunk_tokens():
+    """Number of content tokens that fit in one model input (window minus [CLS]/[SEP])."""
+    return embedding_model.max_seq_length - tokenizer.num_special_tokens_to_add(pair=False)
+
+def _is_word_start(offsets, i):
+    """True if token i does not continue the text of token i - 1."""
+    return i == 0 or offsets[i][0] != offsets[i - 1][1]
+
+def split_to_token_windows(texts, max_tokens=None, overlap=0):
+    """
+    Split texts so that every piece fits the embedding model's input window.
+
+    All texts are tokenized in a single batch call with character offsets, so
+    the pieces are cut straight out of the original strings. Both ends of a
+    piece are moved back to the start of a word when possible, so no word is
+    split in two (except single words longer than the window). An oversized
+    text is split into roughly equal pieces rather than full windows plus a
+    short leftover.
+
+    Args:
+        texts (list): Text chunks to fit.
+        max_tokens (int): Tokens per piece, capped at the model window.
+        overlap (int): Tokens shared between consecutive pieces of one text.
+
+    Returns:
+        list: Pieces in document order; texts that already fit are kept as-is.
+    """
+    window = max_chunk_tokens()
+    limit = window if not max_tokens or max_tokens <= 0 else min(max_tokens, window)
+    overlap = min(max(overlap, 0), limit - 1)
+
+    texts = [t for t in texts if t and t.strip()]
+    if not texts:
+        return []
+
+    with _tokenizer_lock:
+        encoded = tokenizer(
+            texts,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+        )
+
+    pieces = []
+    for text, offsets in zip(texts, encoded["offset_mapping"]):
+        if len(offsets) <= limit:
+            pieces.append(text.strip())
+            continue
+
+        start = 0
+        while start < len(offsets):
+            # Spread what is left evenly over the fewest pieces that fit
+            remaining = len(offsets) - start
+            parts = max(1, math.ceil((remaining - overlap) / (limit - overlap)))
+            size = min(limit, math.ceil((remaining - overlap) / parts) + overlap)
+            end = min(start + size, len(offsets))
+            # Back off while the next token continues the current word
+            cut = end
+            while end < len(offsets) and cut > start + 1 and not _is_word_start(offsets, cut):
+                cut -= 1
+            if cut > start + 1:
+                end = cut
+
+            piece = text[offsets[start][0]:offsets[end - 1][1]].strip()
+            if piece:
+                pieces.append(piece)
+            if end == len(offsets):
+                break
+
+            # Overlap with the previous piece, starting on a word boundary
+            next_start = end - overlap
+            while next_start > start and not _is_word_start(offsets, next_start):
+                next_start -= 1
+            # No room for overlap (e.g. after a long back-off): continue right
+            # after this piece instead of emitting near-duplicates
+            if next_start <= start:
+                next_start = end
+            start = next_start
+    return pieces
+
+def chunk_key(text):
+    """Stable content key for a chunk, used to reuse its embedding across rebuilds."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def get_embeddings_reusing(chunks, cached):
+    """
+    Generate embeddings, reusing vectors from `cached` (chunk_key -> vector)
+    for chunks whose text has not changed. Only new chunks are encoded.
+
+    Returns:
+        tuple: (float32 array of embeddings, number of reused vectors)
+    """
+    keys = [chunk_key(c) for c in chunks]
+    missing = [i for i, k in enumerate(keys) if k not in cached]
+
+    dim = embedding_model.get_sentence_embedding_dimension()
+    embeddings = np.empty((len(chunks), dim), dtype="float32")
+    if missing:
+        embeddings[missing] = get_embeddings([chunks[i] for i in missing])
+    for i, k in enumerate(keys):
+        if k in cached:
+            embeddings[i] = cached[k]
+    return embeddings, len(chunks) - len(missing)
@@ -0,0 +1,243 @@
+import os
+import logging
+
+from core.pdf_parser import extract_pages_from_pdf, chunk_by_topic
+from core.text_store import save_page_texts, load_page_texts, document_name, document_text_key
+from core.embeddings import get_embeddings_reusing, split_to_token_windows
+from core.retrieval import create_faiss_index
+from core.snapshots import load_snapshot, load_snapshot_embeddings, publish_snapshot, clear_snapshots, rollback_snapshot
+from core.llm_integration import generate_answer, generate_answer_async
+from config.settings import UPLOADS_DIR
+
+# Shared upload/reindex/reset pipeline for app.py (Flask) and async_app.py
+# (FastAPI); the two only differ in calling these directly or via an executor.
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = (
+    "Provide a concise, student-friendly summary with bullet points. "
+    "Highlight key concepts, definitions, formulas, and workflows. "
+    "Be faithful to the source and avoid hallucinations."
+)
+
+class KnowledgeBaseError(Exception):
+    """Pipeline failure carrying the message and HTTP status the APIs return."""
+
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+def fixed_chunk(text: str, size: int = 254, overlap: int = 32):
+    """
+    Fixed-size chunking with overlap, measured in embedding-model tokens.
+    `size` is capped at the model's input window so nothing gets truncated.
+    """
+    return split_to_token_windows([text], max_tokens=size, overlap=overlap)
+
+def chunk_text(text: str, settings: dict):
+    """Chunk one document's text according to the given runtime settings."""
+    if settings["mode"] == "topic":
+        return chunk_by_topic(text, similarity_threshold=settings["similarity_threshold"])
+    return fixed_chunk(text, size=settings["chunk_size"], overlap=settings["chunk_overlap"])
+
+def build_index_from_chunks(chunks):
+    """
+    Build the FAISS index, reusing the current snapshot's embeddings of chunks
+    whose text did not change. Returns (index, embeddings, number reused).
+    """
+    cached = load_snapshot_embeddings(load_snapshot())
+    embeddings, reused = get_embeddings_reusing(chunks, cached)
+    index = create_faiss_index(embeddings)
+    return index, embeddings, reused
+
+def ingest_pdf(path, name, settings):
+    """
+    Extract and persist the per-page text of one saved PDF, then chunk it.
+    Returns (chunks, document), where document is the {"name", "text_key"}
+    entry to publish with the snapshot.
+
+    Raises:
+        KnowledgeBaseError: If extraction or chunking fails.
+    """
+    # Extract text (kept per page so /reindex never has to re-parse the PDF)
+    try:
+        pages = extract_pages_from_pdf(path)
+        text = "".join(pages)
+        logger.debug(f"Extracted text from {name}")
+        if not text:
+            raise ValueError("No text extracted")
+        document = {"name": name, "text_key": save_page_texts(pages)}
+    except Exception as e:
+        logger.error(f"Failed to extract text from {name}: {e}")
+        raise KnowledgeBaseError(f"Could not extract text from {name}: {str(e)}")
+
+    # Chunk based on settings
+    try:
+        chunks = chunk_text(text, settings)
+        logger.debug(f"Chunked {name} into {len(chunks)} chunks")
+        return chunks, document
+    except Exception as e:
+        logger.error(f"Failed to chunk {name}: {e}")
+        raise KnowledgeBaseError(f"Failed to chunk {name}: {str(e)}")
+
+def index_uploaded_chunks(chunks, documents):
+    """
+    Build the index for freshly uploaded documents and publish it together
+    with the chunks as one snapshot. Returns the new generation.
+
+    Raises:
+        KnowledgeBaseError: If there is nothing to index or the build fails.
+    """
+    if not chunks:
+        raise KnowledgeBaseError("Could not extract text from the uploaded PDFs.", 400)
+
+    try:
+        index, embeddings, _ = build_index_from_chunks(chunks)
+        generation = publish_snapshot(chunks, index, embeddings, documents)
+        logger.debug(f"Built index and published generation {generation}")
+        return generation
+    except Exception as e:
+        logger.error(f"Failed to build index: {e}")
+        raise KnowledgeBaseError("Failed to build index")
+
+def upload_result(names, chunks, summary, settings):
+    """JSON body returned by /upload."""
+    return {
+        "ok": True,
+        "files": names,
+        "chunks": len(chunks),
+        "summary": summary,
+        "settings_used": settings
+    }
+
+def rechunk_documents(documents, settings):
+    """
+    Chunk a snapshot's documents from their stored page text (no PDF parsing).
+
+    Raises:
+        KnowledgeBaseError: If a document has no stored text or chunking fails.
+    """
+    all_chunks = []
+    for document in documents:
+        name = document_name(document)
+        pages = load_page_texts(document_text_key(document))
+        if pages is None:
+            logger.error(f"No stored text for {name}")
+            raise KnowledgeBaseError(f"No stored text for {name}. Upload it again.", 400)
+        try:
+            chunks = chunk_text("".join(pages), settings)
+            logger.debug(f"Chunked {name} into {len(chunks)} chunks")
+            all_chunks.extend(chunks)
+        except Exception as e:
+            logger.error(f"Failed to chunk {name}: {e}")
+            raise KnowledgeBaseError(f"Failed to chunk {name}: {str(e)}")
+
+    if not all_chunks:
+        raise KnowledgeBaseError("Stored documents produced no chunks.", 400)
+    return all_chunks
+
+def reindex_knowledge_base(settings):
+    """
+    Re-chunk and re-embed the current documents under `settings`, reusing
+    embeddings of unchanged chunks, and publish the result as a new snapshot.
+    Returns the JSON body for /reindex.
+
+    Raises:
+        KnowledgeBaseError: If there is nothing to reindex or a step fails.
+    """
+    snapshot = load_snapshot()
+    if snapshot is None:
+        raise KnowledgeBaseError("No knowledge base loaded. Upload PDFs first.", 400)
+    documents = snapshot.documents
+    if not documents:
+        # e.g. chunks/index adopted from before snapshots existed
+        raise KnowledgeBaseError(
+            "This knowledge base has no stored document text and cannot be reindexed. Upload the PDFs again.", 400
+        )
+
+    all_chunks = rechunk_documents(documents, settings)
+
+    try:
+        index, embeddings, reused = build_index_from_chunks(all_chunks)
+        generation = publish_snapshot(all_chunks, index, embeddings, documents)
+        logger.debug(f"Reindexed {len(all_chunks)} chunks as generation {generation} ({reused} embeddings reused)")
+    except Exception as e:
+        logger.error(f"Failed to reindex: {e}")
+        raise KnowledgeBaseError("Failed to reindex")
+
+    return {
+        "ok": True,
+        "files": [document_name(d) for d in documents],
+        "chunks": len(all_chunks),
+        "reused_embeddings": reused,
+        "generation": generation,
+        "settings_used": settings
+    }
+
+def rollback_knowledge_base(generation=None):
+    """
+    Make an earlier snapshot current again. Returns the JSON body for /rollback.
+
+    Raises:
+        KnowledgeBaseError: If the generation is invalid or does not exist.
+    """
+    try:
+        generation = rollback_snapshot(int(generation) if generation is not None else None)
+    except (ValueError, TypeError) as e:
+        raise KnowledgeBaseError(str(e), 400)
+
+    snapshot = load_snapshot()
+    return {
+        "ok": True,
+        "generation": generation,
+        "chunks": len(snapshot.chunks) if snapshot else 0
+    }
+
+def chunks_info(snapshot=None):
+    """JSON body for /chunks: chunk count plus a small sample."""
+    snapshot = snapshot or load_snapshot()
+    chunks = snapshot.chunks if snapshot else []
+    return {"count": len(chunks), "sample": chunks[:3]}
+
+def reset_knowledge_base():
+    """
+    Delete every snapshot generation (chunks, index, stored text) and the
+    uploads, so the reset cannot be rolled back.
+    Returns the JSON body for /reset.
+    """
+    # In-flight readers keep answering from the snapshot they already loaded
+    clear_snapshots()
+
+    # (optional) Clear uploads — comment out if you want to keep PDFs
+    for name in os.listdir(UPLOADS_DIR):
+        try:
+            os.remove(os.path.join(UPLOADS_DIR, name))
+        except Exception:
+            pass
+
+    return {"ok": True, "message": "Deleted all snapshots (chunks, index, stored text) and uploads."}
+
+def sample_for_summary(chunks, take=12):
+    """Pick up to `take` representative chunks spread across the document(s)."""
+    take = min(take, len(chunks))
+    step = max(1, len(chunks) // take)
+    return [chunks[i] for i in range(0, len(chunks), step)][:take]
+
+def auto_summary_from_chunks(chunks):
+    """
+    Build a concise summary across all chunks.
+    We keep it safe by sampling a subset (avoid huge prompts).
+    """
+    if not chunks:
+        return "No content to summarize."
+
+    # Reuse our chat model with a 'summary' style question
+    return generate_answer(sample_for_summary(chunks), SUMMARY_PROMPT)
+
+async def auto_summary_from_chunks_async(chunks):
+    """Async version of auto_summary_from_chunks (awaits the LLM call)."""
+    if not chunks:
+        return "No content to summarize."
+
+    return await generate_answer_async(sample_for_summary(chunks), SUMMARY_PROMPT)
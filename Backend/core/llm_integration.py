@@ -1,25 +1,13 @@
-from huggingface_hub import InferenceClient
+from huggingface_hub import InferenceClient, AsyncInferenceClient
 from config.settings import HF_API_KEY, MODEL_ID
 
-# Initialize Hugging Face client
+# Initialize Hugging Face clients (the async one is used by async_app.py)
 client = InferenceClient(model=MODEL_ID
 , token=HF_API_KEY)
+async_client = AsyncInferenceClient(model=MODEL_ID, token=HF_API_KEY)
 
-def generate_answer(context_chunks, question):
-    """
-    Generate an answer using the Hugging Face chat API,
-    strictly based on the provided context chunks.
-    
-    Args:
-        context_chunks (list): List of text chunks from the document.
-        question (str): User's question.
-    
-    Returns:
-        str: Generated answer based on context, formatted with bullet points.
-    
-    Raises:
-        Exception: If the API call fails.
-    """
+def build_messages(context_chunks, question):
+    """Build the chat messages asking for an answer grounded in the context chunks."""
     system_prompt = (
         "You are a helpful AI tutor. Answer strictly based on the given context. "
         "Format your response using bullet points or numbered lists for clarity, especially for definitions, concepts, steps, or multiple items. "
@@ -34,20 +22,52 @@ def generate_answer(context_chunks, question):
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": f"Context:\n{context_text}\n\nQuestion: {question}"}
     ]
+    return messages
 
+def format_answer(answer):
+    """Make sure the answer is presented as bullet points."""
+    # Fallback: If no bullet points or lists detected, convert to bullet points
+    if not any(char in answer for char in ['-', '*', '1.', '1)']):
+        lines = [line.strip() for line in answer.split('\n') if line.strip()]
+        if lines:
+            answer = '\n'.join(f"- {line}" for line in lines)
+        else:
+            answer = f"- {answer}"  # Single bullet if no lines
+
+    return answer.strip()
+
+def generate_answer(context_chunks, question):
+    """
+    Generate an answer using the Hugging Face chat API,
+    strictly based on the provided context chunks.
+    
+    Args:
+        context_chunks (list): List of text chunks from the document.
+        question (str): User's question.
+    
+    Returns:
+        str: Generated answer based on context, formatted with bullet points.
+    
+    Raises:
+        Exception: If the API call fails.
+    """
     try:
-        response = client.chat_completion(messages, max_tokens=300)
-        answer = response.choices[0].message["content"]
+        response = client.chat_completion(build_messages(context_chunks, question), max_tokens=300)
+        return format_answer(response.choices[0].message["content"])
+    except Exception as e:
+        raise Exception(f"Failed to generate answer with Hugging Face: {str(e)}")
 
-        # Fallback: If no bullet points or lists detected, convert to bullet points
-        if not any(char in answer for char in ['-', '*', '1.', '1)']):
-            lines = [line.strip() for line in answer.split('\n') if line.strip()]
-            if lines:
-                answer = '\n'.join(f"- {line}" for line in lines)
-            else:
-                answer = f"- {answer}"  # Single bullet if no lines
+async def generate_answer_async(context_chunks, question):
+    """
+    Async version of generate_answer: awaits the Hugging Face chat API
+    without holding a thread while the model is generating.
 
-        return answer.strip()
+    Raises:
+        Exception: If the API call fails.
+    """
+    try:
+        response = await async_client.chat_completion(build_messages(context_chunks, question), max_tokens=300)
+        return format_answer(response.choices[0].message["content"])
     except Exception as e:
         raise Exception(f"Failed to generate answer with Hugging Face: {str(e)}")
 
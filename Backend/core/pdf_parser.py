@@ -2,25 +2,30 @@ import fitz
 from sentence_transformers import SentenceTransformer
 import numpy as np
 from io import BytesIO
+from core.embeddings import split_to_token_windows
 
 # Model to detect topic similarity between paragraphs
 semantic_model = SentenceTransformer("all-MiniLM-L6-v2")
 
-def extract_text_from_pdf(pdf_source):
-    """Extract all text from a PDF. Supports both file paths and file-like objects."""
+def extract_pages_from_pdf(pdf_source):
+    """Extract the text of each page of a PDF. Supports both file paths and file-like objects."""
     if hasattr(pdf_source, "read"):  # Streamlit file uploader object
         pdf_bytes = pdf_source.read()
         doc = fitz.open(stream=pdf_bytes, filetype="pdf")
     else:  # Local file path
         doc = fitz.open(pdf_source)
 
-    text = ""
-    for page in doc:
-        text += page.get_text()
-    return text
+    return [page.get_text() for page in doc]
+
+def extract_text_from_pdf(pdf_source):
+    """Extract all text from a PDF. Supports both file paths and file-like objects."""
+    return "".join(extract_pages_from_pdf(pdf_source))
 
 def chunk_by_topic(text, similarity_threshold=0.75):
-    """Splits PDF text into chunks based on topic similarity."""
+    """
+    Splits PDF text into chunks based on topic similarity.
+    Chunks longer than the embedding model's input window are split further.
+    """
     paragraphs = [p.strip() for p in text.split("\n") if p.strip()]
     chunks = []
 
@@ -46,7 +51,7 @@ def chunk_by_topic(text, similarity_threshold=0.75):
     if current_chunk:
         chunks.append(" ".join(current_chunk))
 
-    return chunks
+    return split_to_token_windows(chunks)
 
 def cosine_similarity(vec1, vec2):
     """Computes cosine similarity between two vectors."""
@@ -2,7 +2,7 @@ import faiss
 import numpy as np
 import os
 import json
-from core.embeddings import embedding_model
+from core.embeddings import embedding_model, chunk_key
 from config.settings import INDEX_DIR, CHUNKS_DIR
 
 def create_faiss_index(embeddings):
@@ -18,30 +18,54 @@ def retrieve_top_k(query, index, chunks, top_k=3):
     distances, indices = index.search(query_embedding, top_k)
     return [chunks[i] for i in indices[0]]
 
-def save_faiss_index(index, filename="study_index.index"):
+def retrieve_top_k_batch(queries, index, chunks, top_k=3):
+    """
+    Retrieve top-k chunks for several queries with one encode and one
+    multi-query index search. Returns one list of chunks per query.
+    """
+    query_embeddings = embedding_model.encode(list(queries))
+    distances, indices = index.search(query_embeddings, min(top_k, index.ntotal))
+    return [[chunks[i] for i in row if i >= 0] for row in indices]
+
+def save_faiss_index(index, filename="study_index.index", directory=INDEX_DIR):
     """Save FAISS index to disk."""
-    path = os.path.join(INDEX_DIR, filename)
+    path = os.path.join(directory, filename)
     faiss.write_index(index, path)
     return path
 
-def load_faiss_index(filename="study_index.index"):
+def load_faiss_index(filename="study_index.index", directory=INDEX_DIR):
     """Load FAISS index from disk."""
-    path = os.path.join(INDEX_DIR, filename)
+    path = os.path.join(directory, filename)
     if os.path.exists(path):
         return faiss.read_index(path)
     return None
 
-def save_chunks(chunks, filename="chunks.json"):
+def save_chunks(chunks, filename="chunks.json", directory=CHUNKS_DIR):
     """Save chunks to JSON file."""
-    path = os.path.join(CHUNKS_DIR, filename)
+    path = os.path.join(directory, filename)
     with open(path, "w", encoding="utf-8") as f:
         json.dump(chunks, f, ensure_ascii=False, indent=2)
     return path
 
-def load_chunks(filename="chunks.json"):
+def load_chunks(filename="chunks.json", directory=CHUNKS_DIR):
     """Load chunks from JSON file."""
-    path = os.path.join(CHUNKS_DIR, filename)
+    path = os.path.join(directory, filename)
     if os.path.exists(path):
         with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
     return None
+
+def save_embedding_cache(chunks, embeddings, filename="study_embeddings.npz", directory=INDEX_DIR):
+    """Save chunk embeddings keyed by chunk content, for reuse on reindex."""
+    path = os.path.join(directory, filename)
+    keys = np.array([chunk_key(c) for c in chunks])
+    np.savez_compressed(path, keys=keys, vectors=np.asarray(embeddings, dtype="float32"))
+    return path
+
+def load_embedding_cache(filename="study_embeddings.npz", directory=INDEX_DIR):
+    """Load saved chunk embeddings as a {chunk_key: vector} dict (empty if none)."""
+    path = os.path.join(directory, filename)
+    if os.path.exists(path):
+        with np.load(path) as data:
+            return dict(zip(data["keys"].tolist(), data["vectors"]))
+    return {}
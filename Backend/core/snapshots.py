@@ -0,0 +1,336 @@
+"""
+Versioned knowledge-base snapshots.
+
+Every upload/reindex writes a complete generation directory
+(data/snapshots/gen-000042/) and then publishes it by atomically replacing the
+CURRENT pointer file. Generation directories are never modified after they are
+published, so readers only need to read the pointer once to pin a consistent
+chunks + index pair, without any locks. Retired generations are deleted after
+a grace period; the newest few are kept so the pointer can be rolled back.
+
+Several processes (API workers, the Streamlit app) may publish at once: each
+writes into its own uniquely named temp directory and claims a generation
+number by renaming it into place, which fails if that number is taken.
+
+Usage:
+    python -m core.snapshots list
+    python -m core.snapshots rollback [generation]
+    python -m core.snapshots gc
+"""
+import os
+import time
+import uuid
+import shutil
+import argparse
+import threading
+from collections import namedtuple
+
+from config.settings import (
+    CHUNKS_DIR,
+    INDEX_DIR,
+    SNAPSHOTS_DIR,
+    SNAPSHOT_GRACE_SECONDS,
+    SNAPSHOT_KEEP,
+)
+from core.retrieval import (
+    save_faiss_index,
+    load_faiss_index,
+    save_chunks,
+    load_chunks,
+    save_embedding_cache,
+    load_embedding_cache,
+)
+from core.text_store import prune_texts, document_text_key
+
+CURRENT_FILE = "CURRENT"
+CHUNKS_FILE = "study_chunks.json"
+INDEX_FILE = "study_index.index"
+EMBEDDINGS_FILE = "study_embeddings.npz"
+DOCUMENTS_FILE = "documents.json"
+# Temp files/dirs untouched for this long belong to a writer that crashed;
+# unreferenced page text this old is no longer part of an in-flight upload
+STALE_TMP_SECONDS = 3600
+
+Snapshot = namedtuple("Snapshot", ["generation", "chunks", "index", "documents"])
+
+# Serializes this process's writers (publish / rollback / gc); readers never
+# take it. Other processes are handled by the rename-based claim in publish.
+_publish_lock = threading.Lock()
+# Last snapshot loaded by this process, reused while it is still current
+_loaded = None
+# Single-flight for cache misses, so a swap makes one thread load the new
+# generation while the others wait for it instead of loading it again
+_load_lock = threading.Lock()
+
+def _gen_dir(generation):
+    return os.path.join(SNAPSHOTS_DIR, f"gen-{generation:06d}")
+
+def _fsync_files(directory):
+    for name in os.listdir(directory):
+        with open(os.path.join(directory, name), "rb") as f:
+            os.fsync(f.fileno())
+
+def _set_current(generation):
+    """Atomically point CURRENT at `generation` (0 means empty knowledge base)."""
+    path = os.path.join(SNAPSHOTS_DIR, CURRENT_FILE)
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(str(generation))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _schedule_gc():
+    timer = threading.Timer(SNAPSHOT_GRACE_SECONDS + 1, gc_snapshots)
+    timer.daemon = True
+    timer.start()
+
+def list_generations():
+    """Return all published generation numbers, oldest first."""
+    generations = []
+    for name in os.listdir(SNAPSHOTS_DIR):
+        if name.startswith("gen-"):
+            try:
+                generations.append(int(name[4:]))
+            except ValueError:
+                pass
+    return sorted(generations)
+
+def current_generation():
+    """Return the generation CURRENT points at, or 0 if there is none."""
+    path = os.path.join(SNAPSHOTS_DIR, CURRENT_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+def publish_snapshot(chunks, index, embeddings=None, documents=None):
+    """
+    Write a complete new generation and make it current.
+
+    Args:
+        chunks (list): Chunk texts, in index order.
+        index: FAISS index built from `chunks`.
+        embeddings: Chunk embeddings to keep for reuse on reindex (optional).
+        documents (list): The documents the chunks came from, as
+            {"name", "text_key"} dicts (see text_store).
+
+    Returns:
+        int: The published generation number.
+    """
+    with _publish_lock:
+        tmp_dir = os.path.join(SNAPSHOTS_DIR, f".tmp-{os.getpid()}-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        try:
+            save_chunks(chunks, CHUNKS_FILE, directory=tmp_dir)
+            save_faiss_index(index, INDEX_FILE, directory=tmp_dir)
+            save_chunks(documents or [], DOCUMENTS_FILE, directory=tmp_dir)
+            if embeddings is not None:
+                save_embedding_cache(chunks, embeddings, EMBEDDINGS_FILE, directory=tmp_dir)
+            _fsync_files(tmp_dir)
+
+            # Claim the next free number; published generations are never
+            # empty, so the rename fails if another process took it first
+            while True:
+                generation = max(list_generations(), default=0) + 1
+                try:
+                    os.rename(tmp_dir, _gen_dir(generation))
+                    break
+                except OSError:
+                    if not os.path.exists(_gen_dir(generation)):
+                        raise
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        _set_current(generation)
+    _schedule_gc()
+    return generation
+
+def clear_snapshots():
+    """
+    Delete the whole knowledge base: unpublish it, then remove every
+    generation, all stored page text, and the pre-snapshot chunks/index files,
+    so nothing can be rolled back to. Readers that already loaded a snapshot
+    keep answering from memory.
+    """
+    with _publish_lock:
+        _set_current(0)
+        for generation in list_generations():
+            shutil.rmtree(_gen_dir(generation), ignore_errors=True)
+        prune_texts([], 0)
+        for path in (os.path.join(CHUNKS_DIR, CHUNKS_FILE), os.path.join(INDEX_DIR, INDEX_FILE)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+def rollback_snapshot(generation=None):
+    """
+    Point CURRENT back at an earlier generation (the newest one before the
+    current one by default) and return it.
+
+    Raises:
+        ValueError: If there is no such generation on disk.
+    """
+    with _publish_lock:
+        generations = list_generations()
+        current = current_generation()
+        if generation is None:
+            candidates = [g for g in generations if g < current] if current else generations
+            if not candidates:
+                raise ValueError("No earlier generation to roll back to")
+            generation = candidates[-1]
+        elif generation not in generations:
+            raise ValueError(f"Generation {generation} does not exist")
+        _set_current(generation)
+    _schedule_gc()
+    return generation
+
+def gc_snapshots(grace_seconds=SNAPSHOT_GRACE_SECONDS, keep=SNAPSHOT_KEEP):
+    """
+    Delete retired generations, keeping the current one and the `keep` newest
+    others, and the stored page text that only they referenced. Nothing is
+    deleted until CURRENT has been stable for `grace_seconds`, so readers that
+    pinned a generation just before the last swap can still finish loading it.
+
+    Returns:
+        list: Generation numbers that were removed.
+    """
+    with _publish_lock:
+        pointer = os.path.join(SNAPSHOTS_DIR, CURRENT_FILE)
+        if not os.path.exists(pointer) or time.time() - os.path.getmtime(pointer) < grace_seconds:
+            return []
+
+        current = current_generation()
+        retired = [g for g in list_generations() if g != current]
+        removed = []
+        for generation in (retired[:-keep] if keep > 0 else retired):
+            # Another process may have rolled back to it meanwhile
+            if generation == current_generation():
+                continue
+            shutil.rmtree(_gen_dir(generation), ignore_errors=True)
+            removed.append(generation)
+
+        # Drop stored page text no remaining generation refers to
+        referenced = set()
+        try:
+            for generation in list_generations():
+                documents = load_chunks(DOCUMENTS_FILE, directory=_gen_dir(generation)) or []
+                referenced.update(document_text_key(d) for d in documents)
+        except (OSError, ValueError):
+            # Another process is changing generations; prune on a later run
+            return removed
+        prune_texts(referenced, STALE_TMP_SECONDS)
+
+        # Leftovers from writers that crashed mid-publish; recent ones may
+        # still be in progress in another process
+        for name in os.listdir(SNAPSHOTS_DIR):
+            if not (name.startswith(".tmp-") or name.startswith(CURRENT_FILE + ".tmp-")):
+                continue
+            path = os.path.join(SNAPSHOTS_DIR, name)
+            try:
+                if time.time() - os.path.getmtime(path) < STALE_TMP_SECONDS:
+                    continue
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+            except OSError:
+                pass
+    return removed
+
+def cached_snapshot():
+    """
+    Return the already loaded snapshot if it is still current, else None.
+    Only reads the CURRENT pointer, so it is cheap enough for an event loop;
+    on None, call load_snapshot() (which also covers an empty knowledge base).
+    """
+    snapshot = _loaded
+    if snapshot is not None and snapshot.generation == current_generation():
+        return snapshot
+    return None
+
+def load_snapshot():
+    """
+    Load the current generation, or None if there is no knowledge base.
+    The returned snapshot is immutable; callers should use it for the whole
+    request instead of reloading.
+    """
+    snapshot = cached_snapshot()
+    if snapshot is not None:
+        return snapshot
+    with _load_lock:
+        # Another thread may have loaded it while this one waited
+        snapshot = cached_snapshot()
+        if snapshot is not None:
+            return snapshot
+        generation = current_generation()
+        if generation == 0:
+            return None
+        return _load_generation(generation)
+
+def _load_generation(generation):
+    global _loaded
+    directory = _gen_dir(generation)
+    try:
+        chunks = load_chunks(CHUNKS_FILE, directory=directory)
+        index = load_faiss_index(INDEX_FILE, directory=directory)
+        documents = load_chunks(DOCUMENTS_FILE, directory=directory) or []
+    except (OSError, ValueError, RuntimeError):
+        # The generation was deleted while loading (reset, or a GC racing a
+        # reader that stalled past the grace period)
+        return None
+    if not chunks or index is None:
+        return None
+
+    snapshot = Snapshot(generation, chunks, index, documents)
+    _loaded = snapshot
+    return snapshot
+
+def load_snapshot_embeddings(snapshot):
+    """Return the {chunk_key: vector} embedding cache stored with a snapshot."""
+    if snapshot is None:
+        return {}
+    try:
+        return load_embedding_cache(EMBEDDINGS_FILE, directory=_gen_dir(snapshot.generation))
+    except (OSError, ValueError):
+        # Deleted by a reset meanwhile; everything is simply re-encoded
+        return {}
+
+def adopt_legacy_files():
+    """
+    Publish chunks/index written by older versions (data/chunks, data/index)
+    as the first generation, if snapshots have never been used. The adopted
+    generation has no stored page text, so it can be queried but not
+    reindexed until the PDFs are uploaded again.
+    """
+    if os.path.exists(os.path.join(SNAPSHOTS_DIR, CURRENT_FILE)):
+        return None
+    chunks = load_chunks(CHUNKS_FILE, directory=CHUNKS_DIR)
+    index = load_faiss_index(INDEX_FILE, directory=INDEX_DIR)
+    if not chunks or index is None:
+        return None
+    return publish_snapshot(chunks, index)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage StudyMate knowledge-base snapshots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Show generations on disk")
+    rollback_parser = commands.add_parser("rollback", help="Make an earlier generation current")
+    rollback_parser.add_argument("generation", type=int, nargs="?")
+    gc_parser = commands.add_parser("gc", help="Delete retired generations")
+    gc_parser.add_argument("--grace", type=float, default=SNAPSHOT_GRACE_SECONDS)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        current = current_generation()
+        for generation in list_generations():
+            print(f"{generation}{'  (current)' if generation == current else ''}")
+    elif args.command == "rollback":
+        try:
+            print(f"Current generation is now {rollback_snapshot(args.generation)}")
+        except ValueError as e:
+            parser.exit(1, f"Error: {e}\n")
+    else:
+        print(f"Removed generations: {gc_snapshots(grace_seconds=args.grace)}")
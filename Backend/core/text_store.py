@@ -0,0 +1,73 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+from config.settings import TEXT_DIR
+
+# Page text is stored by content hash, so a stored file never changes once a
+# generation refers to it (re-uploading a PDF under the same name writes a new
+# file instead of rewriting the text an older generation points at).
+
+def _text_path(text_key):
+    return os.path.join(TEXT_DIR, os.path.basename(text_key) + ".json.gz")
+
+def document_text_key(document):
+    """
+    Text key of a documents.json entry. Generations written before text was
+    content-addressed list bare file names, which were also their text keys.
+    """
+    if isinstance(document, dict):
+        return document.get("text_key") or document.get("name")
+    return document
+
+def document_name(document):
+    """File name of a documents.json entry."""
+    return document.get("name") if isinstance(document, dict) else document
+
+def save_page_texts(pages):
+    """
+    Save the extracted per-page text of one document as gzipped JSON.
+
+    Returns:
+        str: Content key to record in the snapshot and pass to load_page_texts.
+    """
+    payload = json.dumps(pages, ensure_ascii=False, separators=(",", ":"))
+    text_key = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    path = _text_path(text_key)
+    # Always rewrite, even if the file exists: it refreshes the mtime that
+    # prune_texts uses to spare text an upload has not published yet
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)  # readers never see a half-written file
+    return text_key
+
+def load_page_texts(text_key):
+    """Load the per-page text stored under `text_key`, or None if there is none."""
+    path = _text_path(text_key)
+    if os.path.exists(path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    return None
+
+def prune_texts(keep_keys, min_age_seconds):
+    """
+    Remove stored texts (and leftover temp files) not listed in `keep_keys`.
+    Files younger than `min_age_seconds` are kept, since an upload may have
+    saved them before publishing the snapshot that references them.
+    """
+    keep = {os.path.basename(_text_path(key)) for key in keep_keys}
+    removed = []
+    for name in os.listdir(TEXT_DIR):
+        if name in keep:
+            continue
+        path = os.path.join(TEXT_DIR, name)
+        try:
+            if time.time() - os.path.getmtime(path) >= min_age_seconds:
+                os.remove(path)
+                removed.append(name)
+        except OSError:
+            pass
+    return removed